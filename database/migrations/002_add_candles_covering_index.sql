@@ -0,0 +1,10 @@
+-- Covering index for "latest N candles" lookups: a backward scan over
+-- (symbol, timeframe, timestamp DESC) stops after N rows and, with the price
+-- columns included, is answered by an index-only scan.
+-- CONCURRENTLY cannot run inside a transaction block; run with psql -f.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_candles_symbol_timeframe_timestamp_covering
+  ON candles(symbol, timeframe, timestamp DESC)
+  INCLUDE (open, high, low, close, volume);
+
+-- Superseded by the covering index above
+DROP INDEX CONCURRENTLY IF EXISTS idx_candles_symbol_timeframe_timestamp;
@@ -15,9 +15,10 @@ CREATE TABLE IF NOT EXISTS candles (
   UNIQUE(symbol, timeframe, timestamp)
 );
 
--- Index for fast lookups by symbol, timeframe, and timestamp
-CREATE INDEX IF NOT EXISTS idx_candles_symbol_timeframe_timestamp
-  ON candles(symbol, timeframe, timestamp DESC);
+-- Covering index for fast lookups of the latest candles by symbol and timeframe
+CREATE INDEX IF NOT EXISTS idx_candles_symbol_timeframe_timestamp_covering
+  ON candles(symbol, timeframe, timestamp DESC)
+  INCLUDE (open, high, low, close, volume);
 
 -- Index for efficient range queries
 CREATE INDEX IF NOT EXISTS idx_candles_timestamp
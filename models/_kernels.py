@@ -0,0 +1,128 @@
+"""
+Compiled numeric kernels for indicator calculations
+
+Kernels are JIT-compiled with numba when it is installed and otherwise run
+as plain Python/NumPy functions with identical results. Without numba, the
+full-series EMA runs through scipy's compiled lfilter when scipy is available.
+"""
+import numpy as np
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:  # pragma: no cover - numba is optional
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+try:
+    from scipy.signal import lfilter
+except ImportError:  # pragma: no cover - scipy is optional
+    lfilter = None
+
+
+@njit(cache=True)
+def _ema(x, period):
+    """
+    Exponential Moving Average over a contiguous float64 array
+
+    Seeds with the SMA of the first `period` values (pandas_ta convention),
+    leaving the warm-up values as NaN. A period below 1 yields all NaN.
+    """
+    n = x.size
+    out = np.empty(n, dtype=np.float64)
+    out[:] = np.nan
+    if period < 1 or n < period:
+        return out
+
+    alpha = 2.0 / (period + 1)
+    s = 0.0
+    for i in range(period):
+        s += x[i]
+    s /= period
+    out[period - 1] = s
+
+    for i in range(period, n):
+        s = alpha * x[i] + (1.0 - alpha) * s
+        out[i] = s
+
+    return out
+
+
+def _ema_lfilter(x, period):
+    """
+    Same result as _ema, running the recurrence as a first-order IIR filter
+    in scipy's C implementation
+    """
+    n = x.size
+    out = np.full(n, np.nan, dtype=np.float64)
+    if period < 1 or n < period:
+        return out
+
+    alpha = 2.0 / (period + 1)
+    seed = x[:period].mean()
+    out[period - 1] = seed
+
+    if n > period:
+        # Initial filter state (1 - alpha) * seed continues the recurrence from the SMA seed
+        zi = np.array([(1.0 - alpha) * seed])
+        out[period:], _ = lfilter([alpha], [1.0, -(1.0 - alpha)], x[period:], zi=zi)
+
+    return out
+
+
+if not HAS_NUMBA and lfilter is not None:
+    _ema = _ema_lfilter
+
+
+@njit(cache=True)
+def _ema_last3(x, p1, p2, p3):
+    """
+    Latest values of three SMA-seeded EMAs computed in a single pass over x
+
+    An EMA whose period exceeds the number of values is returned as NaN.
+    """
+    n = x.size
+    a1 = 2.0 / (p1 + 1)
+    a2 = 2.0 / (p2 + 1)
+    a3 = 2.0 / (p3 + 1)
+    s1 = 0.0
+    s2 = 0.0
+    s3 = 0.0
+
+    for i in range(n):
+        v = x[i]
+
+        if i < p1:
+            s1 += v
+            if i == p1 - 1:
+                s1 /= p1
+        else:
+            s1 = a1 * v + (1.0 - a1) * s1
+
+        if i < p2:
+            s2 += v
+            if i == p2 - 1:
+                s2 /= p2
+        else:
+            s2 = a2 * v + (1.0 - a2) * s2
+
+        if i < p3:
+            s3 += v
+            if i == p3 - 1:
+                s3 /= p3
+        else:
+            s3 = a3 * v + (1.0 - a3) * s3
+
+    if n < p1:
+        s1 = np.nan
+    if n < p2:
+        s2 = np.nan
+    if n < p3:
+        s3 = np.nan
+
+    return s1, s2, s3
@@ -0,0 +1,159 @@
+"""
+Shared candle models and indicator calculations for the calculation service
+"""
+from typing import Annotated, List, Literal, Dict, Tuple, Union
+import msgspec
+import numpy as np
+import pandas as pd
+from _kernels import _ema, _ema_last3
+
+try:
+    import talib
+except ImportError:  # TA-Lib needs its C library installed; fall back to the numba kernel
+    talib = None
+
+
+# Models
+# Request payloads are msgspec Structs decoded straight from the body; candle
+# lists can hold thousands of entries and per-field pydantic validation dominates
+# EMA periods must be positive; rejected with a 422 at decode time otherwise
+Period = Annotated[int, msgspec.Meta(ge=1)]
+
+
+class CandleData(msgspec.Struct):
+    timestamp: str
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: int
+
+
+class CalculateEMARequest(msgspec.Struct):
+    candles: List[CandleData]
+    period: Period
+
+
+class CalculateTrendRequest(msgspec.Struct):
+    symbol: str
+    timeframe: str
+    candles: List[CandleData]
+    ema_period: Period = 20
+    reliability: Literal["low", "medium", "high"] = "low"
+
+
+# Calculations
+def candles_to_dataframe(
+    candles: Union[List[CandleData], Dict[str, np.ndarray], np.ndarray]
+) -> pd.DataFrame:
+    """
+    Convert candle data to pandas DataFrame
+
+    Accepts a list of CandleData models, or column arrays (a dict or a
+    database.CANDLE_DTYPE array) keyed by open, high, low, close, volume and
+    either ts (epoch seconds) or timestamp (ISO-8601 strings)
+    """
+    if isinstance(candles, (dict, np.ndarray)):
+        columns = candles
+        fields = candles.dtype.names if isinstance(candles, np.ndarray) else candles.keys()
+    else:
+        n = len(candles)
+        columns = {
+            'timestamp': [c.timestamp for c in candles],
+            'open': np.fromiter((c.open for c in candles), dtype=np.float64, count=n),
+            'high': np.fromiter((c.high for c in candles), dtype=np.float64, count=n),
+            'low': np.fromiter((c.low for c in candles), dtype=np.float64, count=n),
+            'close': np.fromiter((c.close for c in candles), dtype=np.float64, count=n),
+            'volume': np.fromiter((c.volume for c in candles), dtype=np.int64, count=n)
+        }
+        fields = columns.keys()
+
+    if 'ts' in fields:
+        timestamps = pd.to_datetime(columns['ts'], unit='s')
+    else:
+        # Explicit format skips per-string format inference
+        timestamps = pd.to_datetime(columns['timestamp'], format='ISO8601', cache=True)
+
+    index = pd.DatetimeIndex(timestamps, name='timestamp')
+    df = pd.DataFrame(
+        {field: columns[field] for field in ('open', 'high', 'low', 'close', 'volume')},
+        index=index
+    )
+    df.sort_index(inplace=True)
+    return df
+
+
+def _ema_values(closes: np.ndarray, period: int) -> np.ndarray:
+    """Calculate EMA over a contiguous float64 array, using TA-Lib when available"""
+    # TA-Lib rejects timeperiod < 2 with TA_BAD_PARAM
+    if talib is not None and period >= 2:
+        return talib.EMA(closes, timeperiod=period)
+    return _ema(closes, period)
+
+
+def _close_array(df: pd.DataFrame) -> np.ndarray:
+    return np.ascontiguousarray(df['close'].to_numpy(dtype=np.float64))
+
+
+def calculate_ema(df: pd.DataFrame, period: int) -> pd.Series:
+    """Calculate Exponential Moving Average"""
+    return pd.Series(_ema_values(_close_array(df), period), index=df.index)
+
+
+# EMA weight vectors keyed by (period, number of closes)
+_EMA_WEIGHTS: Dict[Tuple[int, int], np.ndarray] = {}
+
+
+def _ema_weights(period: int, n: int) -> np.ndarray:
+    """
+    Closed-form weights such that np.dot(weights, closes) equals the last
+    value of an SMA-seeded EMA (see _kernels._ema) over n closes
+    """
+    key = (period, n)
+    weights = _EMA_WEIGHTS.get(key)
+    if weights is None:
+        alpha = 2.0 / (period + 1)
+        decay = 1.0 - alpha
+        weights = np.empty(n, dtype=np.float64)
+        # The seed SMA contributes equally from each of the first `period` closes
+        weights[:period] = decay ** (n - period) / period
+        weights[period:] = alpha * decay ** np.arange(n - period - 1, -1, -1)
+        _EMA_WEIGHTS[key] = weights
+    return weights
+
+
+def ema_last(closes: np.ndarray, period: int) -> float:
+    """Calculate only the latest EMA value as a single dot product"""
+    return float(np.dot(_ema_weights(period, closes.size), closes))
+
+
+def determine_trend(
+    df: pd.DataFrame,
+    reliability: Literal["low", "medium", "high"]
+) -> Literal["up", "down"]:
+    """
+    Determine trend based on reliability level:
+    - low: Price above 20 EMA = uptrend
+    - medium: Price above 20 EMA AND 20 > 50 = uptrend
+    - high: Price above 20 EMA AND 20 > 50 > 200 = uptrend
+    """
+    closes = _close_array(df)
+    current_price = closes[-1]
+
+    # One fused pass; EMAs longer than the data come back as NaN and are unused
+    ema_20, ema_50, ema_200 = _ema_last3(closes, 20, 50, 200)
+
+    if reliability == "low":
+        return "up" if current_price > ema_20 else "down"
+
+    if reliability == "medium":
+        if current_price > ema_20 and ema_20 > ema_50:
+            return "up"
+        else:
+            return "down"
+
+    # High reliability
+    if current_price > ema_20 and ema_20 > ema_50 and ema_50 > ema_200:
+        return "up"
+    else:
+        return "down"
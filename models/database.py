@@ -2,10 +2,11 @@
 Database connection module for PostgreSQL
 """
 import os
-import psycopg2
-from psycopg2 import pool
+from contextlib import asynccontextmanager
+import asyncpg
+import numpy as np
 from dotenv import load_dotenv
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple, AsyncIterator
 
 # Load environment variables
 load_dotenv()
@@ -13,109 +14,259 @@ load_dotenv()
 # Database connection pool
 connection_pool = None
 
+# Candle arrays: timestamp as epoch seconds, prices as float64
+CANDLE_DTYPE = np.dtype([
+    ('ts', 'f8'),
+    ('open', 'f8'),
+    ('high', 'f8'),
+    ('low', 'f8'),
+    ('close', 'f8'),
+    ('volume', 'i8')
+])
 
-def init_db_pool():
+# Candle queries aggregate each column into one float8[]/int8[] per
+# symbol/timeframe, so asyncpg decodes a few arrays instead of a record per row.
+# asyncpg prepares and caches these statements per connection.
+_CANDLE_COLUMNS = """
+    array_agg(EXTRACT(epoch FROM c.timestamp)::float8 ORDER BY c.timestamp) AS ts,
+    array_agg(c.open ORDER BY c.timestamp) AS open,
+    array_agg(c.high ORDER BY c.timestamp) AS high,
+    array_agg(c.low ORDER BY c.timestamp) AS low,
+    array_agg(c.close ORDER BY c.timestamp) AS close,
+    array_agg(c.volume ORDER BY c.timestamp) AS volume
+"""
+
+# Latest $3 candles via a backward index scan
+_FETCH_CANDLES_QUERY = f"""
+    SELECT {_CANDLE_COLUMNS}
+    FROM (
+        SELECT timestamp, open::float8, high::float8, low::float8, close::float8, volume::int8
+        FROM candles
+        WHERE symbol = $1 AND timeframe = $2
+        ORDER BY timestamp DESC
+        LIMIT $3
+    ) c
+"""
+
+# Same per-pair backward scan, laterally joined over every symbol/timeframe,
+# reading only the close column
+_FETCH_CLOSES_BULK_QUERY = """
+    SELECT s.symbol, tf.timeframe, array_agg(c.close ORDER BY c.timestamp) AS close
+    FROM unnest($1::text[]) AS s(symbol)
+    CROSS JOIN unnest($2::text[]) AS tf(timeframe)
+    CROSS JOIN LATERAL (
+        SELECT timestamp, close::float8
+        FROM candles
+        WHERE candles.symbol = s.symbol AND candles.timeframe = tf.timeframe
+        ORDER BY timestamp DESC
+        LIMIT $3
+    ) c
+    GROUP BY s.symbol, tf.timeframe
+"""
+
+# One backward index-only scan per pair over the same window fetch_closes_bulk
+# reads. The newest close is included because the in-progress candle is upserted
+# in place with the same timestamp; the row count and oldest timestamp change
+# when older candles are backfilled or gap-filled under an unchanged newest one.
+_FETCH_LATEST_CANDLES_QUERY = """
+    SELECT s.symbol, tf.timeframe, EXTRACT(epoch FROM w.newest)::float8 AS ts,
+           w.close, w.count, EXTRACT(epoch FROM w.oldest)::float8 AS oldest_ts
+    FROM unnest($1::text[]) AS s(symbol)
+    CROSS JOIN unnest($2::text[]) AS tf(timeframe)
+    CROSS JOIN LATERAL (
+        SELECT max(c.timestamp) AS newest,
+               min(c.timestamp) AS oldest,
+               count(*) AS count,
+               (array_agg(c.close ORDER BY c.timestamp DESC))[1] AS close
+        FROM (
+            SELECT timestamp, close::float8
+            FROM candles
+            WHERE candles.symbol = s.symbol AND candles.timeframe = tf.timeframe
+            ORDER BY timestamp DESC
+            LIMIT $3
+        ) c
+    ) w
+    WHERE w.count > 0
+"""
+
+
+async def init_db_pool():
     """Initialize the database connection pool"""
     global connection_pool
 
     if connection_pool is None:
-        connection_pool = psycopg2.pool.SimpleConnectionPool(
-            1,  # Min connections
-            10,  # Max connections
+        connection_pool = await asyncpg.create_pool(
             host=os.getenv('DB_HOST', 'localhost'),
-            port=os.getenv('DB_PORT', '5432'),
+            port=int(os.getenv('DB_PORT', '5432')),
             database=os.getenv('DB_NAME', 'trade'),
             user=os.getenv('DB_USER', 'tradeuser'),
-            password=os.getenv('DB_PASSWORD', 'tradepass123')
+            password=os.getenv('DB_PASSWORD', 'tradepass123'),
+            min_size=5,  # Min connections
+            max_size=32,  # Max connections
+            command_timeout=10
         )
 
     return connection_pool
 
 
-def get_db_connection():
+async def get_db_connection():
     """Get a connection from the pool"""
     if connection_pool is None:
-        init_db_pool()
+        await init_db_pool()
 
-    return connection_pool.getconn()
+    return await connection_pool.acquire()
 
 
-def return_db_connection(conn):
+async def return_db_connection(conn):
     """Return a connection to the pool"""
     if connection_pool is not None:
-        connection_pool.putconn(conn)
+        await connection_pool.release(conn)
+
+
+@asynccontextmanager
+async def pooled_connection(conn=None) -> AsyncIterator[Any]:
+    """
+    Use the given connection, or check one out of the pool for the block
+
+    Lets callers making several queries share one checkout by passing conn.
+    """
+    if conn is not None:
+        yield conn
+        return
+
+    conn = await get_db_connection()
+    try:
+        yield conn
+    finally:
+        await return_db_connection(conn)
 
 
-def close_db_pool():
+async def close_db_pool():
     """Close all connections in the pool"""
     global connection_pool
 
     if connection_pool is not None:
-        connection_pool.closeall()
+        await connection_pool.close()
         connection_pool = None
 
 
-def fetch_candles(symbol: str, timeframe: str, limit: int = 1000) -> List[Dict[str, Any]]:
+def _candle_array(record: asyncpg.Record) -> np.ndarray:
+    """Build a CANDLE_DTYPE array from a record of aggregated candle columns"""
+    if record is None or record['ts'] is None:
+        return np.empty(0, dtype=CANDLE_DTYPE)
+
+    candles = np.empty(len(record['ts']), dtype=CANDLE_DTYPE)
+    for field in CANDLE_DTYPE.names:
+        candles[field] = record[field]
+    return candles
+
+
+async def fetch_candles(
+    symbol: str,
+    timeframe: str,
+    limit: int = 1000,
+    conn=None
+) -> np.ndarray:
     """
-    Fetch candles from database for a given symbol and timeframe
+    Fetch the most recent candles from database for a given symbol and timeframe
 
     Args:
         symbol: The stock symbol (e.g., 'SPY')
         timeframe: The timeframe (e.g., '1d', '1h', '15m')
         limit: Maximum number of candles to fetch
+        conn: Connection to use instead of checking one out of the pool
 
     Returns:
-        List of candle dictionaries with keys: timestamp, open, high, low, close, volume
+        CANDLE_DTYPE array with fields: ts (epoch seconds), open, high, low, close, volume,
+        in ascending timestamp order
     """
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cursor:
-            query = """
-                SELECT timestamp, open, high, low, close, volume
-                FROM candles
-                WHERE symbol = %s AND timeframe = %s
-                ORDER BY timestamp ASC
-                LIMIT %s
-            """
-            cursor.execute(query, (symbol, timeframe, limit))
-
-            candles = []
-            for row in cursor.fetchall():
-                candles.append({
-                    'timestamp': row[0].isoformat() if row[0] else None,
-                    'open': float(row[1]) if row[1] else 0,
-                    'high': float(row[2]) if row[2] else 0,
-                    'low': float(row[3]) if row[3] else 0,
-                    'close': float(row[4]) if row[4] else 0,
-                    'volume': int(row[5]) if row[5] else 0
-                })
-
-            return candles
+    async with pooled_connection(conn) as conn:
+        record = await conn.fetchrow(_FETCH_CANDLES_QUERY, symbol, timeframe, limit)
 
-    finally:
-        return_db_connection(conn)
+    return _candle_array(record)
 
 
-def fetch_watchlist_symbols() -> List[str]:
+async def fetch_closes_bulk(
+    symbols: List[str],
+    timeframes: List[str],
+    limit: int = 200,
+    conn=None
+) -> Dict[Tuple[str, str], np.ndarray]:
+    """
+    Fetch the most recent closing prices for every symbol/timeframe pair in one query
+
+    Args:
+        symbols: The stock symbols to fetch
+        timeframes: The timeframes to fetch for each symbol
+        limit: Maximum number of closes per symbol/timeframe
+        conn: Connection to use instead of checking one out of the pool
+
+    Returns:
+        Dict mapping (symbol, timeframe) to a float64 array of closes in ascending
+        timestamp order. Pairs without candles are omitted.
+    """
+    if not symbols or not timeframes:
+        return {}
+
+    async with pooled_connection(conn) as conn:
+        records = await conn.fetch(_FETCH_CLOSES_BULK_QUERY, symbols, timeframes, limit)
+
+    return {
+        (record['symbol'], record['timeframe']): np.array(record['close'], dtype=np.float64)
+        for record in records
+    }
+
+
+async def fetch_latest_candles(
+    symbols: List[str],
+    timeframes: List[str],
+    limit: int = 200,
+    conn=None
+) -> Dict[Tuple[str, str], Tuple[float, float, int, float]]:
+    """
+    Fetch a fingerprint of the newest `limit` candles for every symbol/timeframe pair
+
+    Args:
+        symbols: The stock symbols to check
+        timeframes: The timeframes to check for each symbol
+        limit: Number of most recent candles in the window
+        conn: Connection to use instead of checking one out of the pool
+
+    Returns:
+        Dict mapping (symbol, timeframe) to (newest timestamp in epoch seconds,
+        newest close, candle count, oldest timestamp in epoch seconds) over the
+        window. Pairs without candles are omitted.
+    """
+    if not symbols or not timeframes:
+        return {}
+
+    async with pooled_connection(conn) as conn:
+        records = await conn.fetch(_FETCH_LATEST_CANDLES_QUERY, symbols, timeframes, limit)
+
+    return {
+        (record['symbol'], record['timeframe']): (
+            record['ts'], record['close'], record['count'], record['oldest_ts']
+        )
+        for record in records
+    }
+
+
+async def fetch_watchlist_symbols(conn=None) -> List[str]:
     """
     Fetch all symbols in the watchlist
 
+    Args:
+        conn: Connection to use instead of checking one out of the pool
+
     Returns:
         List of symbol strings
     """
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cursor:
-            # Try to get from watchlist table first, fallback to distinct symbols from candles
-            try:
-                cursor.execute("SELECT symbol FROM watchlist ORDER BY symbol")
-                return [row[0] for row in cursor.fetchall()]
-            except Exception as e:
-                # Rollback transaction after error
-                conn.rollback()
-                # If watchlist table doesn't exist, get distinct symbols from candles
-                cursor.execute("SELECT DISTINCT symbol FROM candles ORDER BY symbol")
-                return [row[0] for row in cursor.fetchall()]
+    async with pooled_connection(conn) as conn:
+        # Try to get from watchlist table first, fallback to distinct symbols from candles
+        try:
+            records = await conn.fetch("SELECT symbol FROM watchlist ORDER BY symbol")
+        except asyncpg.PostgresError:
+            # If watchlist table doesn't exist, get distinct symbols from candles
+            records = await conn.fetch("SELECT DISTINCT symbol FROM candles ORDER BY symbol")
 
-    finally:
-        return_db_connection(conn)
+        return [record['symbol'] for record in records]
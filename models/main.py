@@ -1,18 +1,52 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import hashlib
+import anyio
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Literal, Dict
-import pandas as pd
-import pandas_ta as ta
+from fastapi.responses import ORJSONResponse
+from typing import List, Dict, Tuple
+from cachetools import TTLCache
+import msgspec
+import numpy as np
+import orjson
 from datetime import datetime
-from database import fetch_candles, fetch_watchlist_symbols, init_db_pool
+from database import (
+    fetch_closes_bulk,
+    fetch_latest_candles,
+    fetch_watchlist_symbols,
+    init_db_pool,
+    close_db_pool,
+    pooled_connection
+)
+from core import (
+    CalculateEMARequest,
+    CalculateTrendRequest,
+    calculate_ema,
+    candles_to_dataframe,
+    determine_trend,
+    ema_last
+)
+
+app = FastAPI(
+    title="Trade Calculation Service",
+    version="1.0.0",
+    default_response_class=ORJSONResponse
+)
+
+# Thread pool size for sync endpoints (anyio defaults to 40)
+THREADPOOL_SIZE = 64
 
-app = FastAPI(title="Trade Calculation Service", version="1.0.0")
 
 # Initialize database pool on startup
 @app.on_event("startup")
 async def startup_event():
-    init_db_pool()
+    await init_db_pool()
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await close_db_pool()
 
 # CORS middleware
 app.add_middleware(
@@ -24,95 +58,182 @@ app.add_middleware(
 )
 
 
-# Models
-class CandleData(BaseModel):
-    timestamp: str
-    open: float
-    high: float
-    low: float
-    close: float
-    volume: int
+# strict=False keeps pydantic's lax coercion (e.g. numeric strings)
+_ema_request_decoder = msgspec.json.Decoder(CalculateEMARequest, strict=False)
+_trend_request_decoder = msgspec.json.Decoder(CalculateTrendRequest, strict=False)
 
 
-class CalculateEMARequest(BaseModel):
-    candles: List[CandleData]
-    period: int
+# Request bodies aren't pydantic models, so publish their msgspec schemas in
+# the OpenAPI docs explicitly; shared definitions go under components/schemas
+(_ema_request_schema, _trend_request_schema), _request_schema_components = \
+    msgspec.json.schema_components(
+        [CalculateEMARequest, CalculateTrendRequest],
+        ref_template="#/components/schemas/{name}"
+    )
 
 
-class CalculateEMAResponse(BaseModel):
-    ema_values: List[float | None]
+def _request_body_docs(schema: dict) -> dict:
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": schema}}
+        }
+    }
 
 
-class CalculateTrendRequest(BaseModel):
-    symbol: str
-    timeframe: str
-    candles: List[CandleData]
-    ema_period: int = 20
-    reliability: Literal["low", "medium", "high"] = "low"
+def custom_openapi() -> dict:
+    """Default OpenAPI schema plus the msgspec request components"""
+    if app.openapi_schema is None:
+        schema = FastAPI.openapi(app)
+        schema.setdefault("components", {}).setdefault("schemas", {}).update(
+            _request_schema_components
+        )
+    return app.openapi_schema
 
 
-class CalculateTrendResponse(BaseModel):
-    trend: Literal["up", "down"]
-    ema_values: List[float | None]
-    timestamp: str
+app.openapi = custom_openapi
 
 
 # Utility functions
-def candles_to_dataframe(candles: List[CandleData]) -> pd.DataFrame:
-    """Convert candle data to pandas DataFrame"""
-    data = []
-    for candle in candles:
-        data.append({
-            'timestamp': pd.to_datetime(candle.timestamp),
-            'open': candle.open,
-            'high': candle.high,
-            'low': candle.low,
-            'close': candle.close,
-            'volume': candle.volume
-        })
-    df = pd.DataFrame(data)
-    df.set_index('timestamp', inplace=True)
-    df.sort_index(inplace=True)
-    return df
+def _decode_request(decoder: msgspec.json.Decoder, body: bytes):
+    """Decode a JSON request body, raising 422 like FastAPI's validation"""
+    try:
+        return decoder.decode(body)
+    except (msgspec.ValidationError, msgspec.DecodeError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+# Body decoding runs as async dependencies so the CPU-bound endpoints can be
+# plain `def` and execute in the thread pool instead of on the event loop
+async def _ema_request(raw_request: Request) -> CalculateEMARequest:
+    return _decode_request(_ema_request_decoder, await raw_request.body())
+
+
+async def _trend_request(raw_request: Request) -> CalculateTrendRequest:
+    return _decode_request(_trend_request_decoder, await raw_request.body())
+
+
+# Number of most recent closes each /trends calculation reads
+_TRENDS_WINDOW = 200
+
+# Latest /trends result per (symbol, timeframe), stored with the fingerprint of the
+# candle window it was calculated from: the newest candle's (timestamp, close), since
+# the in-progress candle is updated in place without its timestamp changing, plus
+# the window's count and oldest timestamp, which change when older candles are
+# backfilled under an unchanged newest one.
+_trend_cache: Dict[Tuple[str, str], Tuple[Tuple[float, float, int, float], Dict[str, any]]] = {}
+
+# Serialized /trends response and its ETag, shared by requests within the TTL
+_TRENDS_TTL_SECONDS = 30
+_trends_response_cache: TTLCache = TTLCache(maxsize=1, ttl=_TRENDS_TTL_SECONDS)
+_trends_response_lock = asyncio.Lock()
+
+
+def _neutral_trend() -> Dict[str, any]:
+    return {
+        'trend': 'neutral',
+        'percentChange': None
+    }
+
+
+def _trend_from_closes(timeframe: str, closes: np.ndarray) -> Dict[str, any]:
+    """Calculate the EMA trend for one timeframe from its closing prices"""
+    # Determine minimum candles needed based on timeframe
+    # Shorter timeframes use 20 EMA, longer use 50 EMA
+    min_candles = 20 if timeframe in ['1m', '5m', '15m', '30m'] else 50
+
+    if closes.size < min_candles:
+        return _neutral_trend()
+
+    # Use industry-standard moving average for trend determination
+    # Price above MA = Uptrend, Price below MA = Downtrend
+    ema_period = 20 if timeframe in ['1m', '5m', '15m', '30m'] else 50
+
+    # Get latest values
+    current_price = float(closes[-1])
+    current_ema = ema_last(closes, ema_period)
+
+    # Calculate percent change from EMA (shows trend strength)
+    percent_from_ema = ((current_price - current_ema) / current_ema) * 100
 
+    # Determine trend: Price above EMA = Up, Price below EMA = Down
+    if current_price > current_ema:
+        trend = 'up'
+    elif current_price < current_ema:
+        trend = 'down'
+    else:
+        trend = 'neutral'  # Rare case: price exactly on EMA
 
-def calculate_ema(df: pd.DataFrame, period: int) -> pd.Series:
-    """Calculate Exponential Moving Average"""
-    return ta.ema(df['close'], length=period)
+    return {
+        'trend': trend,
+        'percentChange': round(percent_from_ema, 4)
+    }
 
 
-def determine_trend(
-    df: pd.DataFrame,
-    reliability: Literal["low", "medium", "high"]
-) -> Literal["up", "down"]:
+async def _calculate_trends(
+    symbols: List[str],
+    timeframes: List[str],
+    latest: Dict[Tuple[str, str], Tuple[float, float, int, float]],
+    conn
+) -> Dict[str, Dict[str, Dict[str, any]]]:
     """
-    Determine trend based on reliability level:
-    - low: Price above 20 EMA = uptrend
-    - medium: Price above 20 EMA AND 20 > 50 = uptrend
-    - high: Price above 20 EMA AND 20 > 50 > 200 = uptrend
+    Calculate trends for every symbol/timeframe, only fetching candles for
+    pairs whose candle window (per `latest`) changed since the cached calculation
     """
-    current_price = df['close'].iloc[-1]
+    stale = {
+        key for key, window in latest.items()
+        if key not in _trend_cache or _trend_cache[key][0] != window
+    }
+
+    close_sets = {}
+    if stale:
+        # Fetch closes for all stale pairs in one round-trip (need enough for EMA calculation)
+        close_sets = await fetch_closes_bulk(
+            sorted({symbol for symbol, _ in stale}),
+            sorted({timeframe for _, timeframe in stale}),
+            limit=_TRENDS_WINDOW,
+            conn=conn
+        )
+
+    all_trends: Dict[str, Dict[str, Dict[str, any]]] = {}
+
+    for symbol in symbols:
+        symbol_trends = {}
 
-    ema_20 = calculate_ema(df, 20).iloc[-1]
+        for timeframe in timeframes:
+            key = (symbol, timeframe)
 
-    if reliability == "low":
-        return "up" if current_price > ema_20 else "down"
+            if key not in latest:
+                symbol_trends[timeframe] = _neutral_trend()
+            elif key not in stale:
+                symbol_trends[timeframe] = _trend_cache[key][1]
+            else:
+                try:
+                    closes = close_sets.get(key, np.empty(0, dtype=np.float64))
+                    symbol_trends[timeframe] = _trend_from_closes(timeframe, closes)
+                    _trend_cache[key] = (latest[key], symbol_trends[timeframe])
+                except Exception as e:
+                    print(f"Error calculating trend for {symbol}:{timeframe}: {e}")
+                    symbol_trends[timeframe] = _neutral_trend()
 
-    ema_50 = calculate_ema(df, 50).iloc[-1]
+        all_trends[symbol] = symbol_trends
 
-    if reliability == "medium":
-        if current_price > ema_20 and ema_20 > ema_50:
-            return "up"
-        else:
-            return "down"
+    return all_trends
 
-    # High reliability
-    ema_200 = calculate_ema(df, 200).iloc[-1]
 
-    if current_price > ema_20 and ema_20 > ema_50 and ema_50 > ema_200:
-        return "up"
-    else:
-        return "down"
+async def _fetch_all_trends(timeframes: List[str]) -> Tuple[List[str], Dict[str, Dict[str, Dict[str, any]]]]:
+    """Fetch watchlist symbols and their trends over a single pooled connection"""
+    async with pooled_connection() as conn:
+        # Get watchlist symbols
+        symbols = await fetch_watchlist_symbols(conn=conn)
+        latest = await fetch_latest_candles(symbols, timeframes, limit=_TRENDS_WINDOW, conn=conn)
+        return symbols, await _calculate_trends(symbols, timeframes, latest, conn)
+
+
+def _trends_etag(symbols: List[str], all_trends: Dict[str, Dict[str, Dict[str, any]]]) -> str:
+    """Weak ETag over the response content, excluding its generation timestamp"""
+    content = orjson.dumps({'trends': all_trends, 'symbols': symbols})
+    return f'W/"{hashlib.sha1(content).hexdigest()[:16]}"'
 
 
 # Routes
@@ -125,8 +246,8 @@ async def health_check():
     }
 
 
-@app.post("/calculate-ema", response_model=CalculateEMAResponse)
-async def calculate_ema_endpoint(request: CalculateEMARequest):
+@app.post("/calculate-ema", openapi_extra=_request_body_docs(_ema_request_schema))
+def calculate_ema_endpoint(request: CalculateEMARequest = Depends(_ema_request)):
     """Calculate EMA values for chart overlay"""
     try:
         if len(request.candles) < request.period:
@@ -138,17 +259,16 @@ async def calculate_ema_endpoint(request: CalculateEMARequest):
         df = candles_to_dataframe(request.candles)
         ema_series = calculate_ema(df, request.period)
 
-        # Convert to list, replacing NaN with None for JSON serialization
-        ema_values = [float(v) if pd.notna(v) else None for v in ema_series]
-
-        return CalculateEMAResponse(ema_values=ema_values)
+        # Returned as a Response to skip FastAPI's re-encoding; orjson serializes
+        # the float64 buffer directly and writes NaN as null
+        return ORJSONResponse({'ema_values': ema_series.to_numpy(dtype=np.float64)})
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/calculate-trend", response_model=CalculateTrendResponse)
-async def calculate_trend_endpoint(request: CalculateTrendRequest):
+@app.post("/calculate-trend", openapi_extra=_request_body_docs(_trend_request_schema))
+def calculate_trend_endpoint(request: CalculateTrendRequest = Depends(_trend_request)):
     """Calculate trend direction based on reliability level"""
     try:
         # Validate we have enough candles based on reliability
@@ -170,92 +290,54 @@ async def calculate_trend_endpoint(request: CalculateTrendRequest):
 
         # Calculate EMA values for the requested period
         ema_series = calculate_ema(df, request.ema_period)
-        ema_values = [float(v) if pd.notna(v) else None for v in ema_series]
 
-        return CalculateTrendResponse(
-            trend=trend,
-            ema_values=ema_values,
-            timestamp=datetime.now().isoformat()
-        )
+        return ORJSONResponse({
+            'trend': trend,
+            'ema_values': ema_series.to_numpy(dtype=np.float64),
+            'timestamp': datetime.now().isoformat()
+        })
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/trends")
-async def get_all_trends():
+async def get_all_trends(request: Request):
     """
     Calculate trends for all symbols and timeframes from database
     Returns all trends in a single response - Python calculates from DB data only
+
+    Stays async: its queries are awaited on asyncpg and the remaining CPU work
+    is a dot product per stale symbol/timeframe
     """
     try:
-        # Get watchlist symbols
-        symbols = fetch_watchlist_symbols()
-        timeframes = ['1m', '5m', '15m', '30m', '1h', '1d']
-
-        all_trends: Dict[str, Dict[str, Dict[str, any]]] = {}
-
-        for symbol in symbols:
-            symbol_trends = {}
-
-            for timeframe in timeframes:
-                try:
-                    # Fetch candles from database (need enough for EMA calculation)
-                    candle_data = fetch_candles(symbol, timeframe, limit=200)
-
-                    # Determine minimum candles needed based on timeframe
-                    # Shorter timeframes use 20 EMA, longer use 50 EMA
-                    min_candles = 20 if timeframe in ['1m', '5m', '15m', '30m'] else 50
-
-                    if len(candle_data) < min_candles:
-                        symbol_trends[timeframe] = {
-                            'trend': 'neutral',
-                            'percentChange': None
-                        }
-                        continue
-
-                    # Convert to DataFrame for pandas_ta
-                    df = candles_to_dataframe([CandleData(**c) for c in candle_data])
-
-                    # Use industry-standard moving average for trend determination
-                    # Price above MA = Uptrend, Price below MA = Downtrend
-                    ema_period = 20 if timeframe in ['1m', '5m', '15m', '30m'] else 50
-                    ema_series = calculate_ema(df, ema_period)
-
-                    # Get latest values
-                    current_price = df['close'].iloc[-1]
-                    current_ema = ema_series.iloc[-1]
-
-                    # Calculate percent change from EMA (shows trend strength)
-                    percent_from_ema = ((current_price - current_ema) / current_ema) * 100
-
-                    # Determine trend: Price above EMA = Up, Price below EMA = Down
-                    if current_price > current_ema:
-                        trend = 'up'
-                    elif current_price < current_ema:
-                        trend = 'down'
-                    else:
-                        trend = 'neutral'  # Rare case: price exactly on EMA
-
-                    symbol_trends[timeframe] = {
-                        'trend': trend,
-                        'percentChange': round(percent_from_ema, 4)
-                    }
-
-                except Exception as e:
-                    print(f"Error calculating trend for {symbol}:{timeframe}: {e}")
-                    symbol_trends[timeframe] = {
-                        'trend': 'neutral',
-                        'percentChange': None
-                    }
+        # Requests arriving while the response is being built wait for it instead of recomputing
+        async with _trends_response_lock:
+            cached = _trends_response_cache.get('trends')
+            if cached is None:
+                timeframes = ['1m', '5m', '15m', '30m', '1h', '1d']
+
+                symbols, all_trends = await _fetch_all_trends(timeframes)
+
+                body = orjson.dumps({
+                    'trends': all_trends,
+                    'symbols': symbols,
+                    'timestamp': datetime.now().isoformat()
+                })
+                cached = (body, _trends_etag(symbols, all_trends))
+                _trends_response_cache['trends'] = cached
+
+        body, etag = cached
+        headers = {
+            'Cache-Control': f'public, max-age={_TRENDS_TTL_SECONDS}',
+            'ETag': etag
+        }
 
-            all_trends[symbol] = symbol_trends
+        if_none_match = request.headers.get('if-none-match', '')
+        if etag in (tag.strip() for tag in if_none_match.split(',')):
+            return Response(status_code=304, headers=headers)
 
-        return {
-            'trends': all_trends,
-            'symbols': symbols,
-            'timestamp': datetime.now().isoformat()
-        }
+        return Response(body, media_type='application/json', headers=headers)
 
     except Exception as e:
         print(f"Error in get_all_trends: {e}")
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Service modules are imported flat (as uvicorn does from /models)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
@@ -0,0 +1,87 @@
+"""
+EMA implementations checked against a plain Python SMA-seeded recurrence
+"""
+import math
+
+import numpy as np
+import pytest
+
+from _kernels import _ema, _ema_last3, _ema_lfilter, lfilter
+from core import _ema_values, ema_last, talib
+
+PERIODS = [1, 2, 20, 50]
+
+
+def reference_ema(values, period):
+    """pandas_ta convention: NaN warm-up, SMA seed at period - 1, then the recurrence"""
+    out = [math.nan] * len(values)
+    if len(values) < period:
+        return out
+
+    alpha = 2.0 / (period + 1)
+    s = sum(values[:period]) / period
+    out[period - 1] = s
+    for i in range(period, len(values)):
+        s = alpha * values[i] + (1.0 - alpha) * s
+        out[i] = s
+    return out
+
+
+def closes(n, seed=0):
+    return np.random.default_rng(seed).uniform(50.0, 150.0, n)
+
+
+def lengths(period):
+    # n < period, n == period, n > period
+    return [period - 1, period, period + 1, period + 37]
+
+
+@pytest.mark.parametrize('period', PERIODS)
+def test_ema_matches_reference(period):
+    for n in lengths(period):
+        x = closes(n)
+        np.testing.assert_allclose(_ema(x, period), reference_ema(list(x), period), rtol=1e-12)
+
+
+@pytest.mark.skipif(lfilter is None, reason='scipy not installed')
+@pytest.mark.parametrize('period', PERIODS)
+def test_ema_lfilter_matches_reference(period):
+    for n in lengths(period):
+        x = closes(n)
+        np.testing.assert_allclose(
+            _ema_lfilter(x, period), reference_ema(list(x), period), rtol=1e-12
+        )
+
+
+@pytest.mark.skipif(talib is None, reason='TA-Lib not installed')
+@pytest.mark.parametrize('period', PERIODS)
+def test_ema_values_talib_matches_reference(period):
+    for n in lengths(period):
+        x = closes(n)
+        np.testing.assert_allclose(
+            _ema_values(x, period), reference_ema(list(x), period), rtol=1e-10
+        )
+
+
+@pytest.mark.parametrize('period', PERIODS)
+def test_ema_last_matches_reference(period):
+    for n in lengths(period)[1:]:
+        x = closes(n)
+        assert ema_last(x, period) == pytest.approx(reference_ema(list(x), period)[-1], rel=1e-12)
+
+
+@pytest.mark.parametrize('n', [19, 20, 21, 49, 50, 51, 199, 200, 201, 260])
+def test_ema_last3_matches_reference(n):
+    x = closes(n)
+    expected = [reference_ema(list(x), p)[-1] for p in (20, 50, 200)]
+    for value, reference in zip(_ema_last3(x, 20, 50, 200), expected):
+        if math.isnan(reference):
+            assert math.isnan(value)
+        else:
+            assert value == pytest.approx(reference, rel=1e-12)
+
+
+@pytest.mark.parametrize('period', [0, -3])
+def test_ema_non_positive_period_is_nan(period):
+    assert np.isnan(_ema(closes(10), period)).all()
+    assert _ema(np.empty(0), period).size == 0
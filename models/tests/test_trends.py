@@ -0,0 +1,128 @@
+"""/trends caching against stubbed database helpers"""
+import contextlib
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+class FakeDatabase:
+    """In-memory stand-in for the database helpers /trends calls"""
+
+    def __init__(self):
+        self.symbols = ['SPY']
+        self.windows = {}
+        self.closes = {}
+        self.bulk_calls = []
+
+    @contextlib.asynccontextmanager
+    async def pooled_connection(self, conn=None):
+        yield conn
+
+    async def fetch_watchlist_symbols(self, conn=None):
+        return list(self.symbols)
+
+    async def fetch_latest_candles(self, symbols, timeframes, limit=200, conn=None):
+        return dict(self.windows)
+
+    async def fetch_closes_bulk(self, symbols, timeframes, limit=200, conn=None):
+        self.bulk_calls.append((symbols, timeframes))
+        return {
+            (symbol, timeframe): closes[-limit:]
+            for (symbol, timeframe), closes in self.closes.items()
+            if symbol in symbols and timeframe in timeframes
+        }
+
+    def set_closes(self, key, closes, newest_ts=1000.0):
+        """Store closes for a pair along with the window fingerprint they produce"""
+        closes = np.asarray(closes, dtype=np.float64)
+        self.closes[key] = closes
+        window = closes[-200:]
+        self.windows[key] = (newest_ts, float(window[-1]), len(window), newest_ts - len(window) + 1)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    fake = FakeDatabase()
+    for name in ('pooled_connection', 'fetch_watchlist_symbols', 'fetch_latest_candles', 'fetch_closes_bulk'):
+        monkeypatch.setattr(main, name, getattr(fake, name))
+    main._trend_cache.clear()
+    main._trends_response_cache.clear()
+    yield fake
+    main._trend_cache.clear()
+    main._trends_response_cache.clear()
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+def get_trends(client, **kwargs):
+    """Request /trends after the TTL response cache expires"""
+    main._trends_response_cache.clear()
+    return client.get('/trends', **kwargs)
+
+
+def test_backfill_under_unchanged_newest_candle_recalculates(db, client):
+    rising = np.linspace(100.0, 300.0, 200)
+    db.set_closes(('SPY', '1d'), rising[-10:])
+
+    assert get_trends(client).json()['trends']['SPY']['1d']['trend'] == 'neutral'
+
+    # Backfill older candles; the newest candle keeps its timestamp and close
+    db.set_closes(('SPY', '1d'), rising)
+
+    assert get_trends(client).json()['trends']['SPY']['1d']['trend'] == 'up'
+    assert len(db.bulk_calls) == 2
+
+
+def test_matching_if_none_match_returns_304(db, client):
+    db.set_closes(('SPY', '1d'), np.linspace(100.0, 300.0, 200))
+
+    first = client.get('/trends')
+    assert first.status_code == 200
+    etag = first.headers['etag']
+
+    second = client.get('/trends', headers={'If-None-Match': f'"other", {etag}'})
+    assert second.status_code == 304
+    assert second.headers['etag'] == etag
+    assert second.content == b''
+
+
+def test_changed_content_gets_new_etag(db, client):
+    db.set_closes(('SPY', '1d'), np.linspace(100.0, 300.0, 200))
+    first = get_trends(client)
+
+    # Same content regenerated after the TTL keeps its ETag
+    assert get_trends(client).headers['etag'] == first.headers['etag']
+
+    db.set_closes(('SPY', '1d'), np.linspace(300.0, 100.0, 200), newest_ts=1001.0)
+    changed = get_trends(client, headers={'If-None-Match': first.headers['etag']})
+
+    assert changed.status_code == 200
+    assert changed.headers['etag'] != first.headers['etag']
+    assert changed.json()['trends']['SPY']['1d']['trend'] == 'down'
+
+
+def test_unchanged_pairs_skip_closes_fetch(db, client):
+    db.symbols = ['SPY', 'QQQ']
+    db.set_closes(('SPY', '1d'), np.linspace(100.0, 300.0, 200))
+    db.set_closes(('QQQ', '1h'), np.linspace(100.0, 300.0, 200))
+
+    get_trends(client)
+    assert db.bulk_calls == [(['QQQ', 'SPY'], ['1d', '1h'])]
+
+    # Within the TTL the serialized response is reused without touching the database
+    client.get('/trends')
+    assert len(db.bulk_calls) == 1
+
+    # After the TTL only the pair whose window changed is refetched
+    db.set_closes(('QQQ', '1h'), np.linspace(100.0, 301.0, 200), newest_ts=1001.0)
+    get_trends(client)
+    assert db.bulk_calls[1:] == [(['QQQ'], ['1h'])]
+
+    get_trends(client)
+    assert len(db.bulk_calls) == 2